@@ -36,7 +36,13 @@ if __name__ == "__main__":
     srch = Search('conf/search_config.yaml', 0, existing_data)
 
     results = srch.search()
-    
+
+    parse_report = srch.parser.report
+
+    if len(parse_report) != 0:
+        print('Listing fields that failed to parse:')
+        print(parse_report.groupby(['field', 'reason']).size())
+
     if results is not None:
         bql.write_df_to_bq(results, 'schemas/openrent_listings.json', bq_table_ref, client)
 
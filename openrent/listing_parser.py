@@ -0,0 +1,459 @@
+# Standard library imports
+import json
+import re
+from collections import namedtuple
+from datetime import datetime
+
+# Third party library imports
+from bs4 import BeautifulSoup, NavigableString
+from dateutil import parser
+import numpy as np
+import pandas as pd
+
+# Local library imports
+
+
+OVERVIEW_TABLE_CLASS = 'table table-striped intro-stats'
+FEATURES_TABLE_CLASS = 'table table-striped'
+TRANSPORT_TABLE_CLASS = 'table table-striped mt-1'
+LATLNG_REGEX = re.compile(r'LatLng\((.*)\);')
+ROOM_ONLY_TITLES = ['Room in a Shared House', 'Room in a Shared Flat']
+
+# Attributes of a field that each page source needs to locate its value
+SOURCE_ATTRIBUTES = {
+    'title': [],
+    'description': [],
+    'latlng': ['fallback'],
+    'station': ['fallback'],
+    'overview': ['label', 'fallback'],
+    'features': ['label', 'fallback'],
+}
+
+# Columns computed from other fields once every listing has been converted
+DERIVED_COLUMNS = ['available_from_ts', 'room_only', 'rent_per_person']
+
+Field = namedtuple('Field', ['name', 'source', 'label', 'fallback', 'optional', 'default'])
+
+
+def _field(name, source, label=None, fallback=None, optional=False, default=None):
+
+    label = re.compile(label, re.IGNORECASE) if label else None
+
+    return Field(name, source, label, fallback, optional, default)
+
+
+# Declarative table of the fields scraped from a listing page. Labels must
+# match the whole row label of exactly one cell on the page, the fallback is
+# the position the field was historically found at and is only used when no
+# label matches. Types are taken from the BigQuery schema.
+FIELDS = [
+    _field('title', 'title'),
+    _field('location', 'overview', r'^location$', 3),
+    _field('lat', 'latlng', fallback=0),
+    _field('lng', 'latlng', fallback=1),
+    _field('bedrooms', 'overview', r'^bedrooms$', 0),
+    _field('bathrooms', 'overview', r'^bathrooms$', 1),
+    _field('max_tenants', 'overview', r'^max tenants$', 2),
+    _field('description', 'description'),
+    _field('deposit', 'features', r'^deposit$', (0, 1)),
+    _field('rent_total', 'features', r'^rent pcm$', (0, 3)),
+    _field('bills_included', 'features', r'^bills included$', (0, 5)),
+    _field('student_friendly', 'features', r'^student friendly$', (1, 1)),
+    _field('families_allowed', 'features', r'^families allowed$', (1, 3)),
+    _field('pets_allowed', 'features', r'^pets allowed$', (1, 5)),
+    _field('smokers_allowed', 'features', r'^smokers allowed$', (1, 7)),
+    _field('dss_1ha_covers_rent', 'features', r'^dss/lha covers rent$', (1, 9)),
+    _field('available_from', 'features', r'^available from$', (2, 1)),
+    _field('minimum_tenancy', 'features', r'^minimum tenancy$', (2, 3)),
+    _field('has_garden', 'features', r'^garden$', (3, 1)),
+    _field('has_parking', 'features', r'^parking$', (3, 3)),
+    _field('has_fireplace', 'features', r'^fireplace$', (3, 5)),
+    _field('furnished', 'features', r'^furnishing$', (3, 7)),
+    _field('epc_rating', 'features', r'^epc rating$', (3, 9)),
+    _field('closest_station', 'station', fallback=(0, 0), optional=True, default=''),
+    _field('closest_station_mins', 'station', fallback=(0, 1), optional=True),
+    _field('second_closest_station', 'station', fallback=(1, 0), optional=True, default=''),
+    _field('second_closest_station_mins', 'station', fallback=(1, 1), optional=True),
+]
+
+
+def _normalise(text):
+
+    return ' '.join(text.split()).rstrip(':')
+
+
+def _previous_text(element):
+    """ The text directly before an element, either a sibling within the
+        same cell or, failing that, the previous cell of the row.
+    """
+
+    for sibling in element.previous_siblings:
+        text = _normalise(str(sibling) if isinstance(sibling, NavigableString) else sibling.get_text())
+        if text:
+            return text
+
+    cell = element.find_parent('td')
+    previous_cell = cell.find_previous_sibling('td') if cell else None
+
+    return _normalise(previous_cell.get_text()) if previous_cell else ''
+
+
+def _to_string(raw):
+
+    return raw.astype('string').str.strip()
+
+
+def _to_integer(raw):
+
+    digits = _to_string(raw).str.extract(r'(-?\d+)', expand=False)
+
+    return pd.to_numeric(digits.astype(object), errors='coerce').astype('Int64')
+
+
+def _to_float(raw):
+
+    numbers = _to_string(raw).str.replace(r'[^\d.\-]', '', regex=True)
+
+    return pd.to_numeric(numbers.astype(object), errors='coerce').astype('Float64')
+
+
+def _to_boolean(raw):
+
+    # Unticked features are rendered with a cross icon, anything else is a tick
+    converted = (_to_string(raw) != 'fa fa-times').astype('boolean')
+    converted[raw.isna()] = pd.NA
+
+    return converted
+
+
+def _to_date(raw):
+
+    def _parse(value):
+        if pd.isna(value):
+            return pd.NA
+        if value == 'Today':
+            return str(datetime.now().date())
+        try:
+            return str(parser.parse(value).date())
+        except (ValueError, OverflowError):
+            return pd.NA
+
+    return _to_string(raw).map(_parse).astype('string')
+
+
+CONVERTERS = {
+    'STRING': _to_string,
+    'INTEGER': _to_integer,
+    'FLOAT': _to_float,
+    'BOOLEAN': _to_boolean,
+    'DATE': _to_date,
+}
+
+
+class ListingParser():
+    """ Parses openrent listing pages into rows matching the BigQuery schema.
+
+        Raw values are extracted page by page using the FIELDS table, then
+        converted to their schema types in one batch. Any field that could
+        not be found or converted is recorded in the parse report rather
+        than failing the run.
+    """
+
+    def __init__(self, schema_file, record_columns=()):
+        """ Loads the schema and checks the field table against it.
+
+            Args:
+                schema_file: BigQuery json schema of the listings table
+                record_columns: Schema columns populated outside of the parser
+
+            Raises:
+                ValueError if the field table and schema columns differ.
+        """
+        self.types = self._load_schema_types(schema_file)
+        self._check_fields(record_columns)
+        self._issues = []
+
+    def _load_schema_types(self, schema_file):
+
+        with open(schema_file) as f:
+            columns = json.load(f)
+
+        return {col['name']:col['type'] for col in columns}
+
+    def _check_fields(self, record_columns):
+
+        parsed = [f.name for f in FIELDS] + DERIVED_COLUMNS
+        expected = set(self.types) - set(record_columns)
+
+        missing = sorted(expected - set(parsed))
+        unknown = sorted(set(parsed) - expected)
+
+        if missing or unknown:
+            raise ValueError(
+                f"Listing fields do not match schema, missing: {missing}, unknown: {unknown}"
+            )
+
+        unsupported = sorted({self.types[name] for name in parsed} - set(CONVERTERS))
+
+        if unsupported:
+            raise ValueError(f"No converter for schema types: {unsupported}")
+
+        for field in FIELDS:
+            if field.source not in SOURCE_ATTRIBUTES or not hasattr(_ListingPage, f'_lookup_{field.source}'):
+                raise ValueError(f"Unknown source '{field.source}' for field {field.name}")
+
+            unset = [attr for attr in SOURCE_ATTRIBUTES[field.source] if getattr(field, attr) is None]
+
+            if unset:
+                raise ValueError(f"Field {field.name} is missing {unset} for source '{field.source}'")
+
+    @property
+    def report(self):
+        """ Fields that failed to parse during this run, one row per field & listing. """
+
+        return pd.DataFrame(self._issues, columns=['id', 'field', 'reason', 'raw_value'])
+
+    def extract(self, listing_id, page_source):
+        """ Extracts the raw, unconverted values of every field from a listing page.
+
+            Args:
+                listing_id: The id of the listing the page belongs to
+                page_source: The html of the listing page
+
+            Returns:
+                A dictionary of field names and raw values, None where not found.
+        """
+
+        page = _ListingPage(page_source)
+
+        raw = {'id':listing_id}
+
+        for field in FIELDS:
+            value, issue = page.lookup(field, self.types[field.name])
+            if issue:
+                reason, evidence = issue
+                self._issues.append((listing_id, field.name, reason, evidence))
+            raw[field.name] = value
+
+        return raw
+
+    def convert(self, raw_listings):
+        """ Converts raw listings to their schema types & adds derived columns.
+
+            Args:
+                raw_listings: A list of dictionaries returned by extract
+
+            Returns:
+                A dataframe of listing details indexed by id.
+        """
+
+        raw = pd.DataFrame(raw_listings, columns=['id'] + [f.name for f in FIELDS])
+        raw = raw.set_index('id').astype(object)
+
+        details = pd.DataFrame(index=raw.index)
+
+        # Ambiguous fields are already reported, don't report them as missing too
+        reported = {(i, name) for i, name, reason, _ in self._issues if reason == 'ambiguous'}
+
+        for field in FIELDS:
+            converted = self._convert_column(field.name, raw[field.name], field.optional, reported)
+
+            if field.default is not None:
+                converted = converted.fillna(field.default)
+
+            details[field.name] = converted
+
+        # Parsed from the same cell as available_from, which reports it missing
+        details['available_from_ts'] = self._convert_column('available_from_ts', raw['available_from'], True, reported)
+
+        details['room_only'] = details['title'].str.split(',').str[0].isin(ROOM_ONLY_TITLES)
+
+        rent_per_bedroom = (details['rent_total'] / details['bedrooms']).replace([np.inf, -np.inf], np.nan).round(2)
+        details['rent_per_person'] = details['rent_total'].where(details['room_only'], rent_per_bedroom)
+
+        return details
+
+    def _convert_column(self, name, values, optional, reported):
+
+        converted = CONVERTERS[self.types[name]](values)
+
+        missing = values.isna() & (not optional)
+        unparseable = values.notna() & converted.isna()
+
+        for listing_id in values.index[missing]:
+            if (listing_id, name) not in reported:
+                self._issues.append((listing_id, name, 'missing', None))
+        for listing_id, value in values[unparseable].items():
+            self._issues.append((listing_id, name, 'unparseable', value))
+
+        return converted
+
+
+class _ListingPage():
+    """ The lookups of a single listing page, built once when the page is loaded. """
+
+    def __init__(self, page_source):
+
+        soup = BeautifulSoup(page_source, features="lxml")
+
+        self.soup = soup
+        self.latlng = self._get_latlng(page_source)
+        self.overview = self._get_overview(soup)
+        self.overview_labels = self._get_overview_labels(self.overview)
+        self.features = [table.find_all("td") for table in soup.find_all("table", {"class":FEATURES_TABLE_CLASS})]
+        self.feature_labels = self._get_feature_labels(self.features)
+        self.stations = self._get_stations(soup)
+        # Label matches are resolved up front so a fallback can't take a labelled cell.
+        # Cells are keyed by object id, so no cell fills two fields
+        self._matches, self._owners = self._match_labels()
+        self._claimed = {}
+
+    def _get_latlng(self, page_source):
+
+        result = LATLNG_REGEX.search(page_source)
+
+        return result.group(1).split(",") if result else []
+
+    def _get_overview(self, soup):
+
+        tables = soup.find_all("table", {"class":OVERVIEW_TABLE_CLASS})
+
+        return tables[0].find_all("strong") if tables else []
+
+    def _get_overview_labels(self, overview):
+
+        labels = {}
+
+        for strong in overview:
+            labels.setdefault(_previous_text(strong), []).append(strong)
+
+        return labels
+
+    def _get_feature_labels(self, features):
+
+        labels = {}
+
+        for cells in features:
+            for label, value in zip(cells[0::2], cells[1::2]):
+                labels.setdefault(_normalise(label.text), []).append(value)
+
+        return labels
+
+    def _match_labels(self):
+
+        labels = {'overview':self.overview_labels, 'features':self.feature_labels}
+        matches, owners = {}, {}
+
+        for field in FIELDS:
+            if field.source not in labels:
+                continue
+            found = [(label, cell) for label, cells in labels[field.source].items() if field.label.search(label) for cell in cells]
+            matches[field.name] = found
+            for _, cell in found:
+                owners.setdefault(id(cell), []).append(field.name)
+
+        return matches, owners
+
+    def _get_stations(self, soup):
+
+        tables = soup.find_all("table", {"class":TRANSPORT_TABLE_CLASS})
+
+        if not tables:
+            return []
+
+        transport = [_normalise(x.text) for x in tables[0].find_all('td', string=True)]
+
+        rows = list(zip(transport[0::2], transport[1::2]))
+
+        # The first row is the table header, every row after it is a station
+        return rows[1:]
+
+    def lookup(self, field, field_type):
+        """ Finds the raw value of a field on the page.
+
+            Returns:
+                A tuple of the raw value, None if not found, and the issue
+                met finding it as a (reason, evidence) tuple, or None.
+        """
+
+        lookup = getattr(self, f'_lookup_{field.source}')
+
+        # Only the errors raised when an element is missing from the page
+        try:
+            return lookup(field, field_type)
+        except (IndexError, KeyError):
+            return None, None
+
+    def _match_label(self, fallback, field):
+        """ Finds the single cell labelled for a field, or the cell at its
+            fallback position when no label matches.
+
+            Returns:
+                A tuple of the cell, None if ambiguous, and the issue met.
+        """
+
+        matches = self._matches[field.name]
+
+        if len(matches) > 1:
+            return None, ('ambiguous', ', '.join(label for label, _ in matches))
+
+        if matches:
+            label, cell = matches[0]
+            others = [name for name in self._owners[id(cell)] if name != field.name]
+            if others:
+                return None, ('ambiguous', f'{label} also matches {", ".join(others)}')
+            return cell, None
+
+        cell = fallback()
+        owners = self._owners.get(id(cell)) or [self._claimed.setdefault(id(cell), field.name)]
+
+        if owners != [field.name]:
+            return None, ('ambiguous', f'fallback cell used by {", ".join(owners)}')
+
+        return cell, ('fallback', None)
+
+    def _lookup_title(self, field, field_type):
+
+        return self.soup.find_all("h1", {"class":"property-title"})[0].get_text(), None
+
+    def _lookup_description(self, field, field_type):
+
+        return self.soup.find_all("div", {"class":"description"})[0].text, None
+
+    def _lookup_latlng(self, field, field_type):
+
+        return self.latlng[field.fallback], None
+
+    def _lookup_station(self, field, field_type):
+
+        rank, column = field.fallback
+
+        return self.stations[rank][column], None
+
+    def _lookup_overview(self, field, field_type):
+
+        strong, issue = self._match_label(lambda: self.overview[field.fallback], field)
+
+        return self._with_evidence(strong.text if strong else None, issue)
+
+    def _lookup_features(self, field, field_type):
+
+        table, index = field.fallback
+        cell, issue = self._match_label(lambda: self.features[table][index], field)
+
+        if cell is None:
+            return None, issue
+
+        if field_type == 'BOOLEAN':
+            icon = cell.find("i")
+            return self._with_evidence(' '.join(icon['class']) if icon else None, issue)
+
+        return self._with_evidence(cell.text, issue)
+
+    def _with_evidence(self, value, issue):
+
+        # A positional fallback is reported with the value it found
+        if issue and issue[0] == 'fallback':
+            issue = ('fallback', value) if value is not None else None
+
+        return value, issue
@@ -5,7 +5,7 @@ import time
 import re
 from datetime import datetime, timezone
 from os.path import exists
-from re import S, sub
+from re import S
 from decimal import Decimal
 
 # Third party library imports
@@ -20,17 +20,20 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import urllib
 from dateutil import relativedelta as rd
-from dateutil import parser
 import pandas as pd
 import numpy as np
 
 # Local library imports
 from openrent.configloader import ConfigLoader
+from openrent.listing_parser import ListingParser
 
 URL_BASE = 'https://www.openrent.co.uk/'
 URL_ENDPOINT = 'https://www.openrent.co.uk/properties-to-rent/'
 ADVERTS_URLS_SELECTOR = 'a.pli.clearfix'
 MAPS_XPATH_SELECTOR = '/html/body/div[4]/div[2]/section/div[2]/div/div/div/div/div[1]/div[5]/div/div[1]/img[1]'
+SCHEMA_FILE = 'schemas/openrent_listings.json'
+# Schema columns populated from the search results rather than the listing page
+RECORD_COLUMNS = ['id', 'new_listing', 'let_agreed_since_last_run', 'created_at', 'let_agreed', 'let_agreed_at', 'historical']
 
 class Search():
     """ This class scrapes openrent for adverts & saves data into 
@@ -40,16 +43,18 @@ class Search():
         the conf/search_config.yaml file.
     """
 
-    def __init__(self, config_file, search_num, existing_data=None):
+    def __init__(self, config_file, search_num, existing_data=None, schema_file=SCHEMA_FILE):
         """ Initialise the search query. Also loads historical data for avoidance
             of repeated listings
 
             Args:
                 config_file: yaml file containing at least 1 search config params
                 search_num: The number of the search as ordered within the config file
+                schema_file: BigQuery json schema the listing details are checked against
         """
         self.config = ConfigLoader(config_file, search_num)
         self.existing = existing_data
+        self.parser = ListingParser(schema_file, RECORD_COLUMNS)
         self.params = self.config.config
         self.driver = self._get_driver()
         self.url = self._encode_url(self.params)
@@ -174,13 +179,6 @@ class Search():
 
     def _get_listing_details(self, listing_id):
 
-        def _extract_bool_from_html(html_list, ind):
-
-            html = html_list[ind].find("i")['class']
-            bool = ' '.join(html)!="fa fa-times"
-
-            return bool
-        
         url = f'{URL_BASE}{listing_id}'
 
         self.driver.get(url)
@@ -189,107 +187,8 @@ class Search():
         WebDriverWait(self.driver,20).until(EC.element_to_be_clickable((By.XPATH, MAPS_XPATH_SELECTOR))).click()
 
         time.sleep(1.5)
-        result = None
-        response = self.driver.page_source
-
-        while not result:
-            result = re.search('LatLng\((.*)\);', response)
-
-        latlong = result.group(1).split(",")
-        lat = float(latlong[0])
-        lng = float(latlong[1])
-
-        soup = BeautifulSoup(response, features="lxml")
-
-        title = soup.find_all("h1", {"class":"property-title"})[0].string
-
-        overview = soup.find_all("table", {"class":"table table-striped intro-stats"})[0]
-        bedrooms, bathrooms, max_tenants, location  = [x.string for x in overview.find_all("strong")]
-        bedrooms = int(bedrooms)
-        bathrooms = int(bathrooms)
-        max_tenants = int(max_tenants)
-        description = soup.find_all("div", {"class":"description"})[0].text
-
-        features = soup.find_all("table", {"class":"table table-striped"})
-        price_bills = features[0].find_all("td")
-        deposit = float(sub(r'[^\d.]', '', price_bills[1].text))
-        rent_total = float(sub(r'[^\d.]', '', price_bills[3].text))
-        bills_included = _extract_bool_from_html(price_bills, 5)
-
-        tenant_preference = features[1].find_all("td")
-        student_friendly = _extract_bool_from_html(tenant_preference, 1)
-        families_allowed = _extract_bool_from_html(tenant_preference, 3)
-        pets_allowed = _extract_bool_from_html(tenant_preference, 5)
-        smokers_allowed = _extract_bool_from_html(tenant_preference, 7)
-        dss_lha_covers_rent = _extract_bool_from_html(tenant_preference, 9)
-
-        availability = features[2].find_all("td")
-        available_from = availability[1].text
-        available_from_ts = datetime.now() if available_from=="Today" else parser.parse(available_from)
-        available_from_ts = str(available_from_ts.date())
-        minimum_tenancy = availability[3].text
-
-        additional_features = features[3].find_all("td")
-        has_garden = _extract_bool_from_html(additional_features, 1)
-        has_parking = _extract_bool_from_html(additional_features, 3)
-        has_fireplace = _extract_bool_from_html(additional_features, 5)
-        furnished = additional_features[7].text
-        epc_rating = additional_features[9].text
-
-        try:
-            transport = [x.text.replace('\r', '').replace('\n', '').strip() for x in soup.find_all("table", {"class":"table table-striped mt-1"})[0].find_all('td', text=True)]
-        except:
-            transport = list()
-
-        try:
-            closest_station = transport[2]
-            closest_station_mins = int(transport[3].split(' ')[0])
-        except:
-            closest_station = ''
-            closest_station_mins = None
-        
-        try:
-            second_closest_station = transport[4]
-            second_closest_station_mins = int(transport[5].split(' ')[0])
-        except:
-            second_closest_station = ''
-            second_closest_station_mins = None
-
-        room_only = title.split(',')[0] in ['Room in a Shared House', 'Room in a Shared Flat']
-        rent_per_person = round(rent_total/int(bedrooms), 2) if not room_only else rent_total
-        
-        listing_details = {
-                "title":title,
-                "room_only":room_only,
-                "rent_per_person":rent_per_person,
-                "location":location,
-                "lat":lat,
-                "lng":lng,
-                "bedrooms":bedrooms,
-                "bathrooms":bathrooms,
-                "max_tenants":max_tenants,
-                "description":description,
-                "deposit":deposit,
-                "rent_total":rent_total,
-                "bills_included":bills_included,
-                "student_friendly":student_friendly,
-                "families_allowed":families_allowed,
-                "pets_allowed":pets_allowed,
-                "smokers_allowed":smokers_allowed,
-                "dss_1ha_covers_rent":dss_lha_covers_rent,
-                "available_from":available_from,
-                "available_from_ts":available_from_ts,
-                "minimum_tenancy":minimum_tenancy,
-                "has_garden":has_garden,
-                "has_parking":has_parking,
-                "has_fireplace":has_fireplace,
-                "furnished":furnished,
-                "epc_rating":epc_rating,
-                "closest_station":closest_station,
-                "closest_station_mins":closest_station_mins,
-                "second_closest_station":second_closest_station,
-                "second_closest_station_mins":second_closest_station_mins
-            }
+
+        listing_details = self.parser.extract(listing_id, self.driver.page_source)
         
         return listing_details 
 
@@ -357,12 +256,14 @@ class Search():
         ids_to_update = list(df['id'][(df['new_listing']==True) & (df['historical']==False)])
         df = df.set_index('id')
 
-        for id in ids_to_update:
-            d = self._get_listing_details(id)
-            for key in d.keys():
-                if not key in df.columns:
-                    df[key] = None
-                df.loc[id, key] = d.get(key)
+        raw_details = [self._get_listing_details(id) for id in ids_to_update]
+
+        details = self.parser.convert(raw_details)
+
+        for key in details.columns:
+            if not key in df.columns:
+                df[key] = None
+        df.loc[details.index, details.columns] = details.astype(object)
                 
         return df
 
@@ -0,0 +1,211 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from openrent.listing_parser import FIELDS, ListingParser, _field
+
+ROOT = Path(__file__).parents[1]
+SCHEMA_FILE = ROOT / 'schemas' / 'openrent_listings.json'
+LISTING_HTML = (Path(__file__).parent / 'data' / 'listing.html').read_text()
+RECORD_COLUMNS = ['id', 'new_listing', 'let_agreed_since_last_run', 'created_at', 'let_agreed', 'let_agreed_at', 'historical']
+
+EXPECTED = {
+    'title': '2 Bed Flat, Amhurst Road, E8',
+    'location': 'Hackney, E8',
+    'lat': 51.5512,
+    'lng': -0.0596,
+    'bedrooms': 2,
+    'bathrooms': 1,
+    'max_tenants': 3,
+    'description': 'A bright two bedroom flat close to Hackney Downs station.',
+    'deposit': 2307.69,
+    'rent_total': 2000.0,
+    'bills_included': False,
+    'student_friendly': True,
+    'families_allowed': True,
+    'pets_allowed': False,
+    'smokers_allowed': False,
+    'dss_1ha_covers_rent': False,
+    'available_from': '1 June 2022',
+    'available_from_ts': '2022-06-01',
+    'minimum_tenancy': '12 Months',
+    'has_garden': True,
+    'has_parking': False,
+    'has_fireplace': False,
+    'furnished': 'Furnished',
+    'epc_rating': 'C',
+    'closest_station': 'Hackney Downs',
+    'closest_station_mins': 4,
+    'second_closest_station': 'Rectory Road',
+    'second_closest_station_mins': 9,
+    'room_only': False,
+    'rent_per_person': 1000.0,
+}
+
+
+@pytest.fixture
+def parser():
+    return ListingParser(SCHEMA_FILE, RECORD_COLUMNS)
+
+
+def parse(parser, html, listing_id=1):
+    return parser.convert([parser.extract(listing_id, html)]).loc[listing_id]
+
+
+def issues(parser):
+    return sorted(parser.report[['field', 'reason']].itertuples(index=False, name=None))
+
+
+def test_sample_listing(parser):
+    details = parse(parser, LISTING_HTML)
+
+    assert details.to_dict() == EXPECTED
+    assert parser.report.empty
+
+
+def test_reordered_rows(parser):
+    pets = '<tr><td>Pets Allowed</td><td><i class="fa fa-times"></i></td></tr>'
+    smokers = '<tr><td>Smokers Allowed</td><td><i class="fa fa-times"></i></td></tr>'
+    html = LISTING_HTML.replace(pets, 'PETS').replace(smokers, pets).replace('PETS', smokers)
+    html = html.replace(
+        '<tr><td>Student Friendly</td><td><i class="fa fa-check"></i></td></tr>',
+        '<tr><td>Student Friendly</td><td><i class="fa fa-times"></i></td></tr>',
+    )
+
+    details = parse(parser, html)
+
+    assert details['student_friendly'] == False
+    assert details['pets_allowed'] == False
+    assert details['families_allowed'] == True
+    assert parser.report.empty
+
+
+def test_missing_rows(parser):
+    html = LISTING_HTML.replace('<tr><td>Rent PCM</td><td>£2,000.00</td></tr>', '')
+    html = html.replace('<tr><td>EPC Rating</td><td>C</td></tr>', '')
+
+    details = parse(parser, html)
+
+    # The positional fallback for rent now lands on the bills cell, which is
+    # labelled for bills_included, so rent is left empty rather than misread
+    assert pd.isna(details['rent_total'])
+    assert pd.isna(details['rent_per_person'])
+    assert details['bills_included'] == False
+    assert pd.isna(details['epc_rating'])
+    assert issues(parser) == [('epc_rating', 'missing'), ('rent_total', 'ambiguous')]
+
+
+def test_renamed_label_uses_fallback(parser):
+    html = LISTING_HTML.replace('<td>Deposit</td>', '<td>Security Deposit</td>')
+
+    details = parse(parser, html)
+
+    assert details['deposit'] == 2307.69
+    assert parser.report.to_dict('records') == [
+        {'id': 1, 'field': 'deposit', 'reason': 'fallback', 'raw_value': '£2,307.69'}
+    ]
+
+
+def test_duplicate_label_is_ambiguous(parser):
+    html = LISTING_HTML.replace(
+        '<tr><td>Minimum Tenancy</td>',
+        '<tr><td>Rent PCM</td><td>£1,000.00</td></tr><tr><td>Minimum Tenancy</td>',
+    )
+
+    details = parse(parser, html)
+
+    assert pd.isna(details['rent_total'])
+    assert issues(parser) == [('rent_total', 'ambiguous')]
+
+
+def test_overview_labels_in_separate_cells(parser):
+    overview = (
+        '<tr><td>Bedrooms</td><td><strong>2</strong></td><td>Bathrooms</td><td><strong>1</strong></td></tr>'
+        '<tr><td>Location</td><td><strong>Hackney, E8</strong></td><td>Max Tenants</td><td><strong>3</strong></td></tr>'
+    )
+    html = LISTING_HTML.replace(
+        LISTING_HTML[LISTING_HTML.index('<tr>\n            <td>Bedrooms'):LISTING_HTML.index('</tbody>')],
+        overview,
+    )
+
+    details = parse(parser, html)
+
+    assert (details['bedrooms'], details['bathrooms'], details['max_tenants']) == (2, 1, 3)
+    assert details['location'] == 'Hackney, E8'
+    assert parser.report.empty
+
+
+def test_overview_labels_in_one_cell(parser):
+    overview = (
+        '<tr><td>Bedrooms <strong>2</strong> Bathrooms <strong>1</strong> '
+        'Max Tenants <strong>3</strong> Location <strong>Hackney, E8</strong></td></tr>'
+    )
+    html = LISTING_HTML.replace(
+        LISTING_HTML[LISTING_HTML.index('<tr>\n            <td>Bedrooms'):LISTING_HTML.index('</tbody>')],
+        overview,
+    )
+
+    details = parse(parser, html)
+
+    assert (details['bedrooms'], details['bathrooms'], details['max_tenants']) == (2, 1, 3)
+    assert details['location'] == 'Hackney, E8'
+    assert parser.report.empty
+
+
+def test_unparseable_walk_time_keeps_station_order(parser):
+    html = LISTING_HTML.replace('4 minutes', '&lt; a minute')
+
+    details = parse(parser, html)
+
+    assert details['closest_station'] == 'Hackney Downs'
+    assert pd.isna(details['closest_station_mins'])
+    assert details['second_closest_station'] == 'Rectory Road'
+    assert parser.report.to_dict('records') == [
+        {'id': 1, 'field': 'closest_station_mins', 'reason': 'unparseable', 'raw_value': '< a minute'}
+    ]
+
+
+def test_empty_page_reports_required_fields(parser):
+    details = parse(parser, '<html></html>')
+
+    assert details['closest_station'] == ''
+    reported = {field for field, reason in issues(parser)}
+    assert reported == {f.name for f in FIELDS if not f.optional}
+
+
+def test_batch_convert(parser):
+    raw = [parser.extract(1, LISTING_HTML), parser.extract(2, LISTING_HTML.replace('£2,000.00', 'POA'))]
+
+    details = parser.convert(raw)
+
+    assert list(details.index) == [1, 2]
+    assert str(details['bedrooms'].dtype) == 'Int64'
+    assert str(details['rent_total'].dtype) == 'Float64'
+    assert str(details['has_garden'].dtype) == 'boolean'
+    assert details.loc[1, 'rent_total'] == 2000.0
+    assert pd.isna(details.loc[2, 'rent_total'])
+    assert parser.report.to_dict('records') == [
+        {'id': 2, 'field': 'rent_total', 'reason': 'unparseable', 'raw_value': 'POA'}
+    ]
+
+
+def test_fields_checked_against_schema():
+    with pytest.raises(ValueError, match='missing'):
+        ListingParser(SCHEMA_FILE)
+
+
+def test_unknown_source_rejected(monkeypatch):
+    fields = [_field('title', 'heading')] + FIELDS[1:]
+    monkeypatch.setattr('openrent.listing_parser.FIELDS', fields)
+
+    with pytest.raises(ValueError, match="Unknown source 'heading'"):
+        ListingParser(SCHEMA_FILE, RECORD_COLUMNS)
+
+
+def test_missing_label_rejected(monkeypatch):
+    fields = [f._replace(label=None) if f.name == 'deposit' else f for f in FIELDS]
+    monkeypatch.setattr('openrent.listing_parser.FIELDS', fields)
+
+    with pytest.raises(ValueError, match=r"deposit is missing \['label'\]"):
+        ListingParser(SCHEMA_FILE, RECORD_COLUMNS)